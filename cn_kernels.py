@@ -0,0 +1,60 @@
+"""
+Numba kernels for the tridiagonal Crank-Nicolson step.
+They live in their own module so Streamlit imports them once per server process,
+instead of redefining them on every rerun of streamlit_app.py.
+"""
+import numpy as np
+from numba import njit
+
+# Explicit signatures make Numba compile (or load from its on-disk cache) both the complex64 and
+# complex128 builds when this module is first imported.
+thomas_factor_signatures = [
+    "UniTuple(c8[::1], 2)(c8[::1], c8[::1], c8[::1])",
+    "UniTuple(c16[::1], 2)(c16[::1], c16[::1], c16[::1])",
+]
+tridiag_kernel_signatures = [
+    "c8[::1](c8[::1], c8[::1], c8[::1], c8[::1], c8[::1])",
+    "c16[::1](c16[::1], c16[::1], c16[::1], c16[::1], c16[::1])",
+]
+
+@njit(thomas_factor_signatures, fastmath=True, cache=True)
+def thomas_factor(sub, diag, sup):
+    """
+    Forward-eliminate the tridiagonal matrix once for the Thomas algorithm.
+    Returns the modified main diagonal `e` and super-diagonal `f = sup / e`.
+    `sub[i]` couples row i to row i - 1, so `sub[0]` is unused.
+    """
+    N = len(diag)
+    e = np.empty_like(diag)
+    f = np.zeros_like(diag)
+    e[0] = diag[0]
+    for i in range(1, N):
+        f[i - 1] = sup[i - 1] / e[i - 1]
+        e[i] = diag[i] - sub[i] * f[i - 1]
+    return e, f
+
+@njit(tridiag_kernel_signatures, fastmath=True, cache=True)
+def thomas_step(sub, diag_mod, f_mod, rhs, out):
+    """
+    Solve the pre-factorized tridiagonal system for `rhs`, writing the result into `out`.
+    """
+    N = len(rhs)
+    out[0] = rhs[0] / diag_mod[0]
+    for i in range(1, N):  # Forward substitution
+        out[i] = (rhs[i] - sub[i] * out[i - 1]) / diag_mod[i]
+    for i in range(N - 2, -1, -1):  # Backward substitution
+        out[i] -= f_mod[i] * out[i + 1]
+    return out
+
+@njit(tridiag_kernel_signatures, fastmath=True, cache=True)
+def tridiag_matvec(sub, diag, sup, psi, out):
+    """
+    Apply a tridiagonal matrix to `psi` in a single pass, writing the product into `out`.
+    Uses the same padded layout as `thomas_step`: `sub[0]` and `sup[-1]` are unused.
+    """
+    N = len(psi)
+    out[0] = diag[0] * psi[0] + sup[0] * psi[1]
+    for i in range(1, N - 1):
+        out[i] = sub[i] * psi[i - 1] + diag[i] * psi[i] + sup[i] * psi[i + 1]
+    out[N - 1] = sub[N - 1] * psi[N - 2] + diag[N - 1] * psi[N - 1]
+    return out
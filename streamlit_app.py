@@ -1,22 +1,48 @@
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 from scipy.constants import hbar
-from scipy.linalg import solve  # Updated from `expm` to `solve` for stability
+from scipy import fft, sparse
+# scipy.sparse.linalg (expm_multiply) is imported lazily inside the Krylov propagator, since it is
+# slow to import on a cold start. The default Crank-Nicolson path runs on the Numba kernels in cn_kernels.
+from cn_kernels import thomas_factor, thomas_step, tridiag_matvec
+import numexpr as ne
 import streamlit as st
 import plotly.graph_objects as go
 
 # Define constants
 mass = 1.0  # Mass of the particle
+norm_check_interval = 100  # Steps between norm drift checks during time evolution
+norm_tolerance = 1e-8  # Allowed norm drift before the wave function is renormalized
+max_plot_points = 1000  # Traces are decimated to about this many points before being sent to Plotly
+cache_max_entries = 16  # Parameter sets whose Hamiltonian and propagator coefficients stay cached
+animation_frames = 50  # Time intervals in the animation; the initial and final states are both shown
+
+# Propagator choices offered in the sidebar
+crank_nicolson_propagator = "Crank-Nicolson"
+split_operator_propagator = "Split-operator (FFT)"
+krylov_propagator = "Krylov (expm_multiply)"
+
+def grid_spacing(x):
+    """
+    Return the spacing of the uniform grid `x` as a double, even when `x` itself is stored in float32.
+    """
+    return (float(x[-1]) - float(x[0])) / (len(x) - 1)
+
+def wave_function_norm(psi, dx):
+    """
+    Compute the L2 norm of the wave function in a single pass, without a |psi|^2 temporary.
+    """
+    return np.sqrt(np.vdot(psi, psi).real * dx)
 
 def normalize_wave_function(psi, dx):
     """
-    Normalize the wave function to ensure its total probability is 1.
+    Normalize the wave function in place to ensure its total probability is 1.
     If the norm is zero (e.g., due to numerical issues), return the original psi to avoid division by zero.
     """
-    norm = np.sqrt(np.sum(np.abs(psi)**2) * dx)
+    norm = wave_function_norm(psi, dx)
     if norm == 0:  # Handle potential numerical issues
         return psi
-    return psi / norm
+    return np.divide(psi, norm, out=psi)
 
 def initialize_wave_packet(x, x0, k0, sigma):
     """
@@ -26,53 +52,138 @@ def initialize_wave_packet(x, x0, k0, sigma):
     wave_packet = norm * np.exp(-((x - x0)**2) / (2 * sigma**2)) * np.exp(1j * k0 * x)
     return wave_packet
 
+@st.cache_data(max_entries=cache_max_entries)
 def hamiltonian(x, V):
     """
     Construct the Hamiltonian matrix, consisting of kinetic and potential energy terms.
+    H is tridiagonal, so it is stored as a sparse matrix with O(N) memory.
     """
-    dx = x[1] - x[0]
+    dx = grid_spacing(x)
     N = len(x)
-    kinetic = -(hbar**2 / (2 * mass)) * (
-        np.diag(np.ones(N - 1), -1) - 2 * np.diag(np.ones(N)) + np.diag(np.ones(N - 1), 1)
-    ) / dx**2
-    potential = np.diag(V)
-    return kinetic + potential
+    coupling = -hbar**2 / (2 * mass * dx**2)
+    diag = np.full(N, -2 * coupling)
+    diag += V  # Potential written straight onto the kinetic diagonal, no separate matrix
+    off_diag = np.full(N - 1, coupling)
+    return sparse.diags([off_diag, diag, off_diag], [-1, 0, 1], format="csr")
 
-def evolve_wave_function(psi, H, dt):
+@st.cache_data(max_entries=cache_max_entries)
+def crank_nicolson_coefficients(x, V, dt, dtype=np.complex128):
+    """
+    Precompute the Crank-Nicolson matrices A = I - i*dt/2*H and B = I + i*dt/2*H.
+    A is Thomas-factorized once, B is kept as its three (padded) diagonals, all stored as `dtype`.
+    Cached on (x, V, dt, dtype), so reruns that only change the initial wave packet reuse the factors.
+    """
+    H = hamiltonian(x, V)
+    sub, diag, sup = H.diagonal(-1), H.diagonal(), H.diagonal(1)
+    alpha = 1j * dt / 2
+    off_sub = np.zeros(len(diag), dtype=dtype)  # Off-diagonals padded to length N
+    off_sub[1:] = alpha * sub
+    off_sup = np.zeros(len(diag), dtype=dtype)
+    off_sup[:-1] = alpha * sup
+    a_sub = -off_sub
+    e, f = thomas_factor(a_sub, (1 - alpha * diag).astype(dtype), -off_sup)
+    A = (a_sub, e, f)
+    B = (off_sub, (1 + alpha * diag).astype(dtype), off_sup)
+    return A, B
+
+def evolve_wave_function(psi, A, B, rhs, out):
     """
     Perform time evolution of the wave function using the Crank-Nicolson method for stability.
-    Changed from using `expm` to solving the linear equation `Aψ_(n+1) = Bψ_n`.
+    Solves `Aψ_(n+1) = Bψ_n` with the compiled Thomas sweep, O(N) per step.
+    `rhs` and `out` are preallocated buffers; ψ_(n+1) is written into `out`.
+    """
+    tridiag_matvec(*B, psi, rhs)  # Bψ_n, applied as a three-point stencil
+    return thomas_step(*A, rhs, out)  # Solving Aψ_(n+1) = Bψ_n for ψ_(n+1)
+
+@st.cache_data(max_entries=cache_max_entries)
+def split_operator_coefficients(x, V, dt, dtype=np.complex128):
+    """
+    Precompute the phase factors of the split-operator (Strang) propagator for a fixed dt.
+    Uses the same sign and time-unit convention as the Crank-Nicolson step.
+    Cached on (x, V, dt, dtype) like the Crank-Nicolson coefficients.
+    """
+    dx = grid_spacing(x)
+    k = 2 * np.pi * fft.fftfreq(len(x), dx)  # Angular wave numbers of the FFT grid
+    expV_half = np.exp(1j * np.asarray(V, dtype=float) * dt / 2)  # Half step in the potential
+    expT = np.exp(1j * (hbar**2 * k**2 / (2 * mass)) * dt)  # Full kinetic step in momentum space
+    return expV_half.astype(dtype), expT.astype(dtype)
+
+def evolve_split_operator(psi, expV_half, expT, out):
+    """
+    Perform time evolution of the wave function using the FFT split-operator method.
+    Each step is two pointwise multiplies around an FFT pair, O(N log N), with no matrix formed.
+    ψ_(n+1) is written into the preallocated buffer `out`.
+    """
+    np.multiply(expV_half, psi, out=out)
+    spectrum = fft.fft(out, workers=-1)
+    spectrum *= expT
+    out[:] = fft.ifft(spectrum, overwrite_x=True, workers=-1)
+    out *= expV_half
+    return out
+
+@st.cache_data(max_entries=cache_max_entries)
+def krylov_generator(x, V, dt, dtype=np.complex128):
+    """
+    Precompute the sparse generator i*dt*H of a single time step for `expm_multiply`.
+    Uses the same sign and time-unit convention as the Crank-Nicolson step.
+    """
+    return (1j * dt * hamiltonian(x, V)).astype(dtype).tocsr()
+
+def evolve_krylov(psi, G, out):
+    """
+    Perform time evolution of the wave function by applying exp(G) to psi with `expm_multiply`.
+    The exponential is never formed; each step costs a handful of sparse matrix-vector products.
+    """
+    from scipy.sparse.linalg import expm_multiply
+
+    out[:] = expm_multiply(G, psi)
+    return out
+
+def wave_function_components(psi):
     """
-    I = np.eye(len(psi))  # Identity matrix
-    a = I - 1j * dt / 2 * H  # A matrix for Crank-Nicolson method
-    b = I + 1j * dt / 2 * H  # B matrix for Crank-Nicolson method
-    psi_new = solve(a, b @ psi)  # Solving Aψ_(n+1) = Bψ_n for ψ_(n+1)
-    return psi_new
+    Split the wave function into real, imaginary and magnitude parts once, for all plots to share.
+    """
+    re = psi.real
+    im = psi.imag
+    return re, im, np.hypot(re, im)
 
-def plot_wave_function(x, psi, title):
+def plot_wave_function(x, re, im, mag, title):
     """
     Plot the wave function components: real, imaginary, and magnitude parts.
+    The figure for each title is created once per session and only its line data is updated on reruns.
     """
-    fig, ax = plt.subplots(figsize=(8, 4))
-    ax.plot(x, psi.real, label="Real Part", color="blue")
-    ax.plot(x, psi.imag, label="Imaginary Part", color="red")
-    ax.plot(x, np.abs(psi), label="Magnitude", color="green")
+    key = f"figure_{title}"
+    if key not in st.session_state:
+        fig = Figure(figsize=(8, 4))  # Not registered with pyplot, so it is freed with the session
+        ax = fig.subplots()
+        lines = [
+            ax.plot([], [], label="Real Part", color="blue")[0],
+            ax.plot([], [], label="Imaginary Part", color="red")[0],
+            ax.plot([], [], label="Magnitude", color="green")[0],
+        ]
+        ax.set_ylim(-1, 1)
+        ax.set_title(title)
+        ax.legend()
+        ax.set_xlabel("x")
+        ax.set_ylabel("Wave Function")
+        st.session_state[key] = (fig, ax, lines)
+    fig, ax, lines = st.session_state[key]
+    for line, y in zip(lines, (re, im, mag)):
+        line.set_data(x, y)
     ax.set_xlim(x[0], x[-1])
-    ax.set_ylim(-1, 1)
-    ax.set_title(title)
-    ax.legend()
-    ax.set_xlabel("x")
-    ax.set_ylabel("Wave Function")
-    st.pyplot(fig)
+    st.pyplot(fig, clear_figure=False)
 
-def interactive_3d_visualization(x, psi):
+def interactive_3d_visualization(x, re, im, mag):
     """
     Create an interactive 3D visualization of the wave function components.
+    Large grids are decimated and sent as float32 arrays, which plotly>=6 binary-encodes, to keep the payload small.
     """
+    stride = max(1, len(x) // max_plot_points)
+    xs = x[::stride].astype(np.float32)
     fig = go.Figure()
-    fig.add_trace(go.Scatter3d(x=x, y=np.zeros_like(x), z=psi.real, mode='lines', name='Real Part'))
-    fig.add_trace(go.Scatter3d(x=x, y=np.ones_like(x), z=psi.imag, mode='lines', name='Imaginary Part'))
-    fig.add_trace(go.Scatter3d(x=x, y=2 * np.ones_like(x), z=np.abs(psi), mode='lines', name='Magnitude'))
+    fig.add_trace(go.Scatter3d(x=xs, y=np.zeros_like(xs), z=re[::stride].astype(np.float32), mode='lines', name='Real Part'))
+    fig.add_trace(go.Scatter3d(x=xs, y=np.ones_like(xs), z=im[::stride].astype(np.float32), mode='lines', name='Imaginary Part'))
+    fig.add_trace(go.Scatter3d(x=xs, y=2 * np.ones_like(xs), z=mag[::stride].astype(np.float32), mode='lines', name='Magnitude'))
     fig.update_layout(
         title="3D Wave Function Visualization",
         scene=dict(
@@ -83,6 +194,48 @@ def interactive_3d_visualization(x, psi):
     )
     st.plotly_chart(fig)
 
+def animation_frame(x, psi, step):
+    """
+    Build one Plotly animation frame from a snapshot of the wave function.
+    The frame is a plain dict holding decimated copies of the data, so it is only validated
+    once, when the animated figure is assembled.
+    """
+    stride = max(1, len(x) // max_plot_points)
+    re, im, mag = wave_function_components(psi[::stride])
+    xs = x[::stride].astype(np.float32)
+    return dict(
+        data=[
+            dict(type="scatter", x=xs, y=re.astype(np.float32), mode='lines', name='Real Part', line=dict(color="blue")),
+            dict(type="scatter", x=xs, y=im.astype(np.float32), mode='lines', name='Imaginary Part', line=dict(color="red")),
+            dict(type="scatter", x=xs, y=mag.astype(np.float32), mode='lines', name='Magnitude', line=dict(color="green")),
+        ],
+        name=str(step),
+    )
+
+def animated_visualization(frames):
+    """
+    Show the collected frames as a Plotly animation with play button and step slider.
+    """
+    fig = go.Figure(data=frames[0]["data"], frames=frames)
+    fig.update_layout(
+        title="Wave Function Animation",
+        xaxis_title="x",
+        yaxis_title="Wave Function",
+        yaxis_range=[-1, 1],
+        updatemenus=[dict(
+            type="buttons",
+            buttons=[dict(label="Play", method="animate",
+                          args=[None, {"frame": {"duration": 50, "redraw": False}, "fromcurrent": True}])]
+        )],
+        sliders=[dict(
+            currentvalue=dict(prefix="Step: "),
+            steps=[dict(label=frame["name"], method="animate",
+                        args=[[frame["name"]], {"mode": "immediate", "frame": {"duration": 0, "redraw": False}}])
+                   for frame in frames]
+        )]
+    )
+    st.plotly_chart(fig)
+
 # Streamlit App
 st.title("Wave Function Visualizer in Quantum Computing")
 st.sidebar.title("Simulation Parameters")
@@ -90,8 +243,11 @@ st.sidebar.title("Simulation Parameters")
 # Simulation parameters
 x_min = st.sidebar.number_input("x_min", value=-10.0, step=1.0)
 x_max = st.sidebar.number_input("x_max", value=10.0, step=1.0)
-N = st.sidebar.number_input("Number of spatial points (N)", value=500, step=10)
-x = np.linspace(x_min, x_max, int(N))
+N = int(st.sidebar.number_input("Number of spatial points (N)", value=500, step=10))
+fast_mode = st.sidebar.checkbox("Fast (FP32)", help="Build the grid and propagate in single precision: half the memory traffic, lower precision")
+dtype = np.complex64 if fast_mode else np.complex128
+# In FP32 mode the float32 grid also halves the potential and wave-packet temporaries
+x = np.linspace(x_min, x_max, N, dtype=np.float32 if fast_mode else np.float64)
 
 default_x0 = (x_min + x_max) / 2
 x0 = st.sidebar.slider("Initial position (x0)", min_value=float(x_min), max_value=float(x_max), value=default_x0)
@@ -101,47 +257,82 @@ sigma = st.sidebar.slider("Wave packet width (sigma)", min_value=0.1, max_value=
 k_potential = st.sidebar.slider("Spring constant (k) for harmonic potential", min_value=0.1, max_value=10.0, value=1.0, step=0.1)
 V = 0.5 * k_potential * x**2  # Harmonic potential
 
-dx = x[1] - x[0]
+# Custom potential, applied before the propagator is built
+st.sidebar.subheader("Custom Potential")
+use_custom_potential = st.sidebar.checkbox("Use custom potential")
+if use_custom_potential:
+    V_custom = st.sidebar.text_area("Enter custom potential as an expression in x (e.g., 0.5 * x**2 or exp(-x**2))", value="0.5 * x**2")
+    try:
+        # Only x is visible to the expression; numexpr>=2.8.5 parses it without calling eval
+        V_user = ne.evaluate(V_custom, local_dict={"x": x}, global_dict={})
+        if len(V_user) != len(x):
+            st.sidebar.error("Custom potential must match the spatial grid size.")
+        elif np.iscomplexobj(V_user) or not np.all(np.isfinite(V_user)):
+            st.sidebar.error("Custom potential must be real and finite everywhere on the grid.")
+        else:
+            V = V_user
+            st.sidebar.success("Custom potential applied successfully.")
+    except Exception as e:
+        st.sidebar.error(f"Error in custom potential: {e}")
+
+dx = grid_spacing(x)
 time_steps = st.sidebar.number_input("Number of time steps", value=200, step=10)
 dt = st.sidebar.number_input("Time step (dt)", value=0.01, step=0.001, format="%.3f")
+propagator = st.sidebar.selectbox("Propagator", [crank_nicolson_propagator, split_operator_propagator, krylov_propagator])
+show_animation = st.sidebar.checkbox("Show animation", help=f"Animate up to {animation_frames + 1} evenly spaced snapshots, from the initial to the final state")
 
-# Initialize wave packet and Hamiltonian
-psi = initialize_wave_packet(x, x0, k0, sigma)
+# Initialize wave packet and propagator (cached across reruns)
+psi = initialize_wave_packet(x, x0, k0, sigma).astype(dtype)
 psi = normalize_wave_function(psi, dx)
-H = hamiltonian(x, V)
+if propagator == crank_nicolson_propagator:
+    A, B = crank_nicolson_coefficients(x, V, dt, dtype)
+elif propagator == split_operator_propagator:
+    expV_half, expT = split_operator_coefficients(x, V, dt, dtype)
+else:
+    G = krylov_generator(x, V, dt, dtype)
 
 # Display initial wave function
 st.header("Initial Wave Function")
-plot_wave_function(x, psi, "Initial Wave Function")
-interactive_3d_visualization(x, psi)
+components = wave_function_components(psi)
+plot_wave_function(x, *components, "Initial Wave Function")
+interactive_3d_visualization(x, *components)
 
 # Time evolution
 st.header("Wave Function Dynamics")
 progress_bar = st.progress(0)
+progress_every = max(1, time_steps // 100)  # Refresh the bar ~100 times, not every step
+inv_time_steps = 1.0 / max(1, time_steps)
 psi_evolved = psi.copy()
+psi_next = np.empty_like(psi_evolved)  # Buffers reused by every step
+rhs = np.empty_like(psi_evolved)
+# Evenly spaced steps from 0 to time_steps inclusive, so the final state is always captured
+snapshot_steps = set(np.linspace(0, time_steps, animation_frames + 1, dtype=int).tolist())
+frames = [animation_frame(x, psi, 0)] if show_animation else []
 for t in range(time_steps):
-    psi_evolved = evolve_wave_function(psi_evolved, H, dt)
-    psi_evolved = normalize_wave_function(psi_evolved, dx)
-    progress_bar.progress((t + 1) / time_steps)
+    if propagator == crank_nicolson_propagator:
+        evolve_wave_function(psi_evolved, A, B, rhs, psi_next)
+    elif propagator == split_operator_propagator:
+        evolve_split_operator(psi_evolved, expV_half, expT, psi_next)
+    else:
+        evolve_krylov(psi_evolved, G, psi_next)
+    psi_evolved, psi_next = psi_next, psi_evolved
+    # All propagators are unitary, so only renormalize if round-off has made the norm drift
+    if (t + 1) % norm_check_interval == 0 and abs(wave_function_norm(psi_evolved, dx) - 1) > norm_tolerance:
+        normalize_wave_function(psi_evolved, dx)
+    if show_animation and t + 1 in snapshot_steps:
+        frames.append(animation_frame(x, psi_evolved, t + 1))
+    if (t + 1) % progress_every == 0 or t == time_steps - 1:
+        progress_bar.progress((t + 1) * inv_time_steps)
+normalize_wave_function(psi_evolved, dx)
 
 if not np.any(psi_evolved):
     st.error("Final wave function is empty. Please check the parameters and try again.")
 else:
     st.subheader("Final Wave Function After Evolution")
-    plot_wave_function(x, psi_evolved, "Final Wave Function")
-    interactive_3d_visualization(x, psi_evolved)
+    components = wave_function_components(psi_evolved)
+    plot_wave_function(x, *components, "Final Wave Function")
+    interactive_3d_visualization(x, *components)
 
-# Additional feature: Custom potential
-st.sidebar.subheader("Custom Potential")
-use_custom_potential = st.sidebar.checkbox("Use custom potential")
-if use_custom_potential:
-    V_custom = st.sidebar.text_area("Enter custom potential as a Python expression (e.g., 0.5 * x**2)", value="0.5 * x**2")
-    try:
-        V = eval(V_custom)
-        if len(V) == len(x):
-            H = hamiltonian(x, V)
-            st.success("Custom potential applied successfully.")
-        else:
-            st.error("Custom potential must match the spatial grid size.")
-    except Exception as e:
-        st.error(f"Error in custom potential: {e}")
+if show_animation:
+    st.subheader("Wave Function Animation")
+    animated_visualization(frames)
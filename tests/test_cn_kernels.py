@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from cn_kernels import thomas_factor, thomas_step, tridiag_matvec
+
+TOLERANCE = {np.complex64: 1e-5, np.complex128: 1e-12}
+
+
+def random_tridiagonal(n, dtype, seed=0):
+    """Return padded (sub, diag, sup) diagonals of a diagonally dominant random matrix and its dense form."""
+    rng = np.random.default_rng(seed)
+    def random_complex(size):
+        return rng.standard_normal(size) + 1j * rng.standard_normal(size)
+    sub = random_complex(n).astype(dtype)
+    sup = random_complex(n).astype(dtype)
+    sub[0] = 0
+    sup[-1] = 0
+    diag = (random_complex(n) + 6).astype(dtype)
+    dense = np.diag(diag) + np.diag(sub[1:], -1) + np.diag(sup[:-1], 1)
+    return (sub, diag, sup), dense, random_complex(n).astype(dtype)
+
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_thomas_solve_matches_dense_solve(dtype):
+    (sub, diag, sup), dense, rhs = random_tridiagonal(64, dtype)
+    e, f = thomas_factor(sub, diag, sup)
+    out = thomas_step(sub, e, f, rhs, np.empty_like(rhs))
+    expected = np.linalg.solve(dense.astype(np.complex128), rhs.astype(np.complex128))
+    assert np.max(np.abs(out - expected)) < TOLERANCE[dtype]
+
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_tridiag_matvec_matches_dense_product(dtype):
+    bands, dense, psi = random_tridiagonal(64, dtype, seed=1)
+    out = tridiag_matvec(*bands, psi, np.empty_like(psi))
+    expected = dense.astype(np.complex128) @ psi.astype(np.complex128)
+    assert np.max(np.abs(out - expected)) < TOLERANCE[dtype] * 10
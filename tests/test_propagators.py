@@ -0,0 +1,86 @@
+import numpy as np
+import pytest
+import streamlit as st
+from scipy.linalg import expm
+
+import streamlit_app as app
+
+STEPS = 20
+DT = 1e-3
+TOLERANCE = {np.complex64: 1e-5, np.complex128: 1e-8}
+CRANK_NICOLSON_ERROR = 1e-6  # Second-order truncation error of 20 Crank-Nicolson steps at DT
+
+
+@pytest.fixture
+def unit_hbar(monkeypatch):
+    """Use hbar = 1 so the kinetic term is not negligible next to V, as it is with SI hbar."""
+    monkeypatch.setattr(app, "hbar", 1.0)
+    st.cache_data.clear()
+    yield
+    st.cache_data.clear()
+
+
+def grid_and_state(dtype):
+    real = np.float32 if dtype == np.complex64 else np.float64
+    x = np.linspace(-5, 5, 64, dtype=real)
+    V = 0.5 * x**2
+    psi = app.initialize_wave_packet(x, 0.5, 2.0, 0.8).astype(dtype)
+    return x, V, app.normalize_wave_function(psi, app.grid_spacing(x))
+
+
+def evolve(step, psi):
+    psi = psi.copy()
+    out = np.empty_like(psi)
+    for _ in range(STEPS):
+        step(psi, out)
+        psi, out = out, psi
+    return psi
+
+
+def exact(H, psi):
+    """Apply exp(i*STEPS*DT*H), the app's sign and time-unit convention, in double precision."""
+    return expm(1j * STEPS * DT * H) @ psi.astype(np.complex128)
+
+
+def assert_close(result, expected, psi, tolerance):
+    """Check `result` against `expected`, and that the evolution moved psi well beyond `tolerance`."""
+    assert np.max(np.abs(expected - psi)) > 100 * tolerance
+    assert np.max(np.abs(result - expected)) < tolerance
+
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_crank_nicolson_matches_expm(unit_hbar, dtype):
+    x, V, psi = grid_and_state(dtype)
+    A, B = app.crank_nicolson_coefficients(x, V, DT, dtype)
+    rhs = np.empty_like(psi)
+    result = evolve(lambda p, out: app.evolve_wave_function(p, A, B, rhs, out), psi)
+    H = app.hamiltonian(x, V).toarray()
+    I = np.eye(len(x))
+    cayley = np.linalg.matrix_power(np.linalg.solve(I - 0.5j * DT * H, I + 0.5j * DT * H), STEPS)
+    assert result.dtype == dtype
+    assert_close(result, cayley @ psi.astype(np.complex128), psi, TOLERANCE[dtype])
+    assert_close(result, exact(H, psi), psi, max(TOLERANCE[dtype], CRANK_NICOLSON_ERROR))
+
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_krylov_matches_expm(unit_hbar, dtype):
+    x, V, psi = grid_and_state(dtype)
+    G = app.krylov_generator(x, V, DT, dtype)
+    result = evolve(lambda p, out: app.evolve_krylov(p, G, out), psi)
+    H = app.hamiltonian(x, V).toarray()
+    assert result.dtype == dtype
+    assert_close(result, exact(H, psi), psi, TOLERANCE[dtype])
+
+
+@pytest.mark.parametrize("dtype", [np.complex64, np.complex128])
+def test_split_operator_matches_expm(unit_hbar, dtype):
+    x, V, psi = grid_and_state(dtype)
+    expV_half, expT = app.split_operator_coefficients(x, V, DT, dtype)
+    result = evolve(lambda p, out: app.evolve_split_operator(p, expV_half, expT, out), psi)
+    # The split-operator method discretizes the kinetic term spectrally, so compare against that H
+    N = len(x)
+    k = 2 * np.pi * np.fft.fftfreq(N, app.grid_spacing(x))
+    kinetic = np.fft.ifft(k[:, None]**2 / (2 * app.mass) * np.fft.fft(np.eye(N), axis=0), axis=0)
+    H = kinetic + np.diag(V.astype(np.float64))
+    assert result.dtype == dtype
+    assert_close(result, exact(H, psi), psi, TOLERANCE[dtype])
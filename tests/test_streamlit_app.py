@@ -0,0 +1,56 @@
+import json
+from pathlib import Path
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+APP = str(Path(__file__).resolve().parents[1] / "streamlit_app.py")
+
+
+def final_wave_function_chart(at):
+    """Return the serialized 3D chart of the final wave function from the last run."""
+    assert not at.exception
+    return at.get("plotly_chart")[-1].proto.spec
+
+
+@pytest.mark.parametrize("propagator", ["Crank-Nicolson", "Split-operator (FFT)"])
+def test_rerun_with_identical_inputs_is_reproducible(propagator):
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    if at.sidebar.selectbox[0].value != propagator:
+        at.sidebar.selectbox[0].select(propagator)
+        at.run()
+    first = final_wave_function_chart(at)
+    at.run()
+    assert final_wave_function_chart(at) == first
+
+
+@pytest.mark.parametrize("expression", ["1j * x", "log(x)"])
+def test_complex_or_non_finite_custom_potential_is_rejected(expression):
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    next(cb for cb in at.sidebar.checkbox if cb.label == "Use custom potential").check()
+    at.run()
+    at.sidebar.text_area[0].input(expression)
+    at.run()
+    assert not at.exception
+    assert [e.value for e in at.sidebar.error] == ["Custom potential must be real and finite everywhere on the grid."]
+    assert not at.sidebar.success
+
+
+def test_fast_mode_animation_ends_on_final_step():
+    at = AppTest.from_file(APP, default_timeout=120)
+    at.run()
+    for checkbox in at.sidebar.checkbox:
+        if checkbox.label in ("Fast (FP32)", "Show animation"):
+            checkbox.check()
+    next(n for n in at.sidebar.number_input if n.label == "Number of time steps").set_value(101)
+    at.run()
+    assert not at.exception
+    animation = json.loads(at.get("plotly_chart")[-1].proto.spec)
+    names = [frame["name"] for frame in animation["frames"]]
+    assert names[0] == "0" and names[-1] == "101"
+    assert len(names) == 51